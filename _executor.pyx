@@ -0,0 +1,104 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""C implementation of the BrainFuck interpreter loop.
+
+This module is optional. ``executor.execute`` uses it when it has been built
+and falls back to the pure Python loop otherwise. Build it in place with::
+
+    CFLAGS="-O3 -march=native" cythonize -i _executor.pyx
+
+Adding ``-fopenmp`` to ``CFLAGS`` and ``LDFLAGS`` lets :func:`execute_batch`
+run the tapes of a batch in parallel.
+"""
+
+from cython.parallel cimport prange
+
+# Opcodes of the compiled representation, see ``executor.py``.
+cdef enum:
+    ADD = 0
+    MOVE = 1
+    JZ = 2
+    JNZ = 3
+    CLEAR = 4
+    MULADD = 5
+    SCAN = 6
+    SPIN = 7
+
+
+cdef void _run(const int[:] ops, signed char *tape, long steps, int size) noexcept nogil:
+    """Run compiled ``ops`` on the ``size`` cells at ``tape`` in place."""
+    cdef Py_ssize_t prog_len = ops.shape[0] // 3
+    cdef Py_ssize_t instr_ptr = 0
+    cdef long executed = 0
+    cdef int data_ptr = 0
+    cdef int mask = size - 1
+    cdef int opcode, arg, arg2, moves, ptr
+    cdef Py_ssize_t i, iteration
+    cdef long repeats
+
+    while instr_ptr < prog_len and executed < steps:
+        opcode = ops[3 * instr_ptr]
+        arg = ops[3 * instr_ptr + 1]
+        arg2 = ops[3 * instr_ptr + 2]
+        if opcode == ADD:
+            tape[data_ptr] = <signed char>(tape[data_ptr] + arg)
+        elif opcode == MOVE:
+            data_ptr = (data_ptr + arg) & mask
+        elif opcode == JZ:
+            if tape[data_ptr] == 0:
+                instr_ptr = arg
+        elif opcode == JNZ:
+            if tape[data_ptr] != 0:
+                instr_ptr = arg
+        elif opcode == CLEAR:
+            tape[data_ptr] = 0
+        elif opcode == MULADD:
+            tape[(data_ptr + arg) & mask] = <signed char>(
+                tape[(data_ptr + arg) & mask]
+                + arg2 * <unsigned char>tape[data_ptr])
+        elif opcode == SCAN:
+            moves = 0
+            while tape[data_ptr] != 0 and moves < size:
+                data_ptr = (data_ptr + arg) & mask
+                moves += 1
+            if tape[data_ptr] != 0:
+                break  # no reachable cell is zero, so the loop never ends
+        else:  # SPIN
+            if tape[data_ptr] == 0:
+                instr_ptr = arg
+            else:
+                # Apply every full iteration that fits in the step budget.
+                iteration = arg - instr_ptr
+                repeats = (steps - executed - 1) // iteration
+                ptr = data_ptr
+                for i in range(instr_ptr + 1, arg):
+                    if ops[3 * i] == ADD:
+                        tape[ptr] = <signed char>(
+                            tape[ptr] + (ops[3 * i + 1] * repeats) % 256)
+                    else:
+                        ptr = (ptr + ops[3 * i + 1]) & mask
+                executed += repeats * iteration
+        instr_ptr += 1
+        executed += 1
+
+
+def execute_compiled(const int[:] ops, signed char[:] tape, long steps, int size):
+    """Run compiled ``ops`` on ``tape`` in place for up to ``steps`` ops.
+
+    ``ops`` holds the ``(opcode, arg, arg2)`` triples produced by
+    ``executor._compile`` flattened into one int array. ``tape`` must contain
+    ``size`` signed bytes, where ``size`` is a power of two.
+    """
+    with nogil:
+        _run(ops, &tape[0], steps, size)
+
+
+def execute_batch(const int[:] ops, signed char[:] tapes, long steps, int size):
+    """Run compiled ``ops`` on every tape in ``tapes`` in place.
+
+    ``tapes`` holds consecutive tapes of ``size`` signed bytes each. When the
+    module is compiled with OpenMP the tapes are processed in parallel.
+    """
+    cdef Py_ssize_t count = tapes.shape[0] // size
+    cdef Py_ssize_t i
+    for i in prange(count, nogil=True):
+        _run(ops, &tapes[i * size], steps, size)
@@ -2,89 +2,299 @@
 
 from __future__ import annotations
 
+import math
+import multiprocessing
+import os
+import queue
 import random
-from typing import Sequence
+import sys
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import accumulate
+from typing import Any, Callable, Hashable, Sequence
 
-from fitness import Task, evaluate, AdditionTask
+from executor import program_key
+from fitness import Task, evaluate, generate_inputs, AdditionTask
 
 
-INSTRUCTIONS = "><+-[]"
+INSTRUCTIONS = b"><+-[]"
 
 
-def _random_program(rng: random.Random, length: int) -> str:
+def _random_program(rng: random.Random, length: int) -> bytes:
     """Return a random program of ``length`` instructions."""
-    chars: list[str] = []
+    chars = bytearray()
     for _ in range(length):
         if rng.random() < 0.1:
-            chars.extend(["[", "]"])
+            chars += b"[]"
         else:
             chars.append(rng.choice(INSTRUCTIONS))
-    return "".join(chars)
-
-
-def _mutate(program: str, rng: random.Random, rate: float) -> str:
-    """Return a mutated copy of ``program``."""
-    chars = list(program)
-    i = 0
-    while i < len(chars):
-        if rng.random() < rate:
-            choice = rng.choice(["sub", "del", "ins"])
-            if choice == "sub":
-                chars[i] = rng.choice(INSTRUCTIONS)
-            elif choice == "del":
-                chars.pop(i)
-                continue
-            else:  # ins
-                if rng.random() < 0.1:
-                    chars.insert(i, '[')
-                    chars.insert(i + 1, ']')
-                    i += 2
-                else:
-                    chars.insert(i, rng.choice(INSTRUCTIONS))
-                    i += 1
-        i += 1
-    if rng.random() < rate:
-        if rng.random() < 0.1:
-            chars.extend(['[', ']'])
-        else:
+    return bytes(chars)
+
+
+def _insert_random(chars: bytearray, rng: random.Random) -> None:
+    """Append the instructions added by an insertion mutation to ``chars``."""
+    if rng.random() < 0.1:
+        chars += b"[]"
+    else:
+        chars.append(rng.choice(INSTRUCTIONS))
+
+
+def _mutate(program: bytes, rng: random.Random, rate: float) -> bytes:
+    """Return a mutated copy of ``program``.
+
+    Every position, plus one past the end, is mutated with probability
+    ``rate``. Instead of drawing a random number per position, the gap to the
+    next mutated position is drawn from the matching geometric distribution,
+    so the cost scales with the number of mutations rather than the length.
+    """
+    if rate <= 0:
+        return program
+    log_keep = math.log1p(-rate) if rate < 1 else float("-inf")
+    length = len(program)
+    chars = bytearray()
+    start = 0
+    pos = -1
+    while True:
+        pos += 1 + int(math.log(1.0 - rng.random()) / log_keep)
+        if pos >= length:
+            break
+        chars += program[start:pos]
+        choice = rng.choice(["sub", "del", "ins"])
+        if choice == "sub":
             chars.append(rng.choice(INSTRUCTIONS))
-    return "".join(chars)
+            start = pos + 1
+        elif choice == "del":
+            start = pos + 1
+        else:  # ins, keeping the current instruction after the insertion
+            _insert_random(chars, rng)
+            start = pos
+    chars += program[start:]
+    if pos == length:
+        _insert_random(chars, rng)
+    return bytes(chars)
 
 
-def _crossover(a: str, b: str, rng: random.Random) -> str:
+def _crossover(a: bytes, b: bytes, rng: random.Random) -> bytes:
     """Create a program by crossing ``a`` and ``b``."""
     if not a and not b:
-        return ""
+        return b""
     cut_a = rng.randint(0, len(a))
     cut_b = rng.randint(0, len(b))
     return a[:cut_a] + b[cut_b:]
 
 
-def _select(population: Sequence[str], fitnesses: Sequence[float], rng: random.Random) -> str:
-    """Fitness-proportional random selection.
+def _build_selector(fitnesses: Sequence[float]) -> list[float]:
+    """Return cumulative selection weights for :func:`_select`.
 
     ``fitnesses`` may contain negative values. They are shifted so that the
     lowest fitness corresponds to weight ``0``.
     """
     if not fitnesses:
-        return rng.choice(population)
+        return []
     min_fit = min(fitnesses)
-    if min_fit < 0:
-        weights = [f - min_fit for f in fitnesses]
-    else:
-        weights = list(fitnesses)
-    if sum(weights) == 0:
+    shift = min_fit if min_fit < 0 else 0.0
+    return list(accumulate(f - shift for f in fitnesses))
+
+
+def _select(population: Sequence[bytes], cumulative: Sequence[float], rng: random.Random) -> bytes:
+    """Fitness-proportional random selection.
+
+    ``cumulative`` holds the weights built by :func:`_build_selector` for
+    ``population``. If every weight is ``0`` a uniformly random program is
+    returned.
+    """
+    if not cumulative or cumulative[-1] <= 0:
         return rng.choice(population)
-    return rng.choices(population, weights=weights, k=1)[0]
+    index = bisect_right(cumulative, rng.random() * cumulative[-1], 0, len(cumulative) - 1)
+    return population[index]
+
+
+def _eval_worker(args: tuple[bytes, Task, int, list[list[int]], array]) -> float:
+    """Evaluate one program. Defined at module level so it can be pickled."""
+    program, task, steps, inputs, packed = args
+    return evaluate(program, task=task, steps=steps, inputs=inputs, packed=packed)
+
+
+def _evaluate_population(population: Sequence[bytes], task: Task, steps: int,
+                         inputs: list[list[int]], packed: array,
+                         cache: dict[Hashable, float],
+                         pool: Executor | None, workers: int) -> list[float]:
+    """Return the score of every program in ``population`` on ``inputs``.
+
+    Programs that compile to the same ops behave identically, so each distinct
+    compiled form is evaluated once and elites, duplicate children and
+    programs differing only in cancelling or unmatched instructions share a
+    score. ``cache`` maps compiled forms to their score on ``inputs``; it is
+    consulted first and updated with the new results. When ``pool`` is given
+    the evaluations are spread over its ``workers`` processes. ``packed``
+    holds ``inputs`` packed by :func:`generate_inputs`.
+    """
+    keys = [program_key(prog, task.size) for prog in population]
+    pending = {key: prog for key, prog in zip(keys, population) if key not in cache}
+    jobs = [(prog, task, steps, inputs, packed) for prog in pending.values()]
+    if pool is None:
+        results = map(_eval_worker, jobs)
+    else:
+        chunksize = max(1, len(jobs) // (4 * workers))
+        results = pool.map(_eval_worker, jobs, chunksize=chunksize)
+    cache.update(zip(pending, results))
+    return [cache[key] for key in keys]
+
+
+def _evolve_population(population_size: int, elite_count: int, generations: int, *,
+                       mutation_rate: float, crossover_rate: float, task: Task,
+                       instances: int, steps: int, init_length: int,
+                       resample_every: int, rng: random.Random, verbose: int,
+                       pool: Executor | None, workers: int,
+                       migrate: Callable[[list[bytes]], list[bytes]] | None = None,
+                       migration_every: int = 1,
+                       label: str = "") -> tuple[bytes, float]:
+    """Evolve one population and return its best program and score.
+
+    This is the generational loop behind :func:`evolve`. When ``migrate`` is
+    given it is called with the sorted population every ``migration_every``
+    generations, and the programs it returns join the next generation right
+    after the elites. ``label`` prefixes progress output.
+    """
+    if init_length > 0:
+        population = [_random_program(rng, init_length) for _ in range(population_size)]
+    else:
+        population = [b"" for _ in range(population_size)]
+
+    if generations < 1:
+        # Nothing evolves, so return the best of the initial population.
+        inputs, packed = generate_inputs(task, rng, instances)
+        scores = _evaluate_population(population, task, steps, inputs, packed,
+                                      {}, pool, workers)
+        best = max(range(len(population)), key=scores.__getitem__)
+        return population[best], scores[best]
+
+    best_prog = b""
+    best_score = float("-inf")
+
+    score_cache: dict[Hashable, float] = {}
+    for gen in range(generations):
+        if gen % resample_every == 0:
+            eval_inputs, eval_packed = generate_inputs(task, rng, instances)
+            score_cache.clear()
+        scores = _evaluate_population(population, task, steps, eval_inputs,
+                                      eval_packed, score_cache, pool, workers)
+        pairs = list(zip(population, scores))
+        pairs.sort(key=lambda p: p[1], reverse=True)
+        population = [p[0] for p in pairs]
+        scores = [p[1] for p in pairs]
+
+        if scores[0] > best_score:
+            best_prog = population[0]
+            best_score = scores[0]
+
+        if verbose:
+            avg = sum(scores) / len(scores)
+            msg = f"{label}Gen {gen + 1}/{generations}: best={scores[0]} avg={avg:.2f}\n"
+            if verbose > 1:
+                msg += f"{label}  Best program: {population[0].decode()!r}\n"
+            # One write per generation keeps lines from concurrent islands whole.
+            sys.stdout.write(msg)
+            sys.stdout.flush()
+
+        elites = population[:elite_count]
+        cumulative = _build_selector(scores)
+
+        new_population = elites.copy()
+        if (migrate is not None and (gen + 1) % migration_every == 0
+                and gen + 1 < generations):
+            new_population.extend(migrate(population))
+            del new_population[population_size:]
+        while len(new_population) < population_size:
+            if rng.random() < crossover_rate:
+                parent1 = _select(population, cumulative, rng)
+                parent2 = _select(population, cumulative, rng)
+                child = _crossover(parent1, parent2, rng)
+            else:
+                parent = _select(population, cumulative, rng)
+                child = parent
+            child = _mutate(child, rng, mutation_rate)
+            new_population.append(child)
+
+        population = new_population
+
+    return best_prog, best_score
+
+
+def _island_worker(index: int, population_size: int, elite_count: int,
+                   generations: int, settings: dict[str, Any], seed: int,
+                   migration_every: int, migration_k: int,
+                   inbox: multiprocessing.Queue, outbox: multiprocessing.Queue,
+                   results: multiprocessing.Queue) -> None:
+    """Evolve one island and put ``(index, program, score)`` on ``results``.
+
+    Every ``migration_every`` generations the island sends its best
+    ``migration_k`` programs to ``outbox`` and takes the programs the previous
+    island sent from ``inbox``.
+    """
+    def migrate(population: list[bytes]) -> list[bytes]:
+        outbox.put(population[:migration_k])
+        return inbox.get()
+
+    best_prog, best_score = _evolve_population(
+        population_size, elite_count, generations, rng=random.Random(seed),
+        pool=None, workers=1, migrate=migrate, migration_every=migration_every,
+        label=f"Island {index + 1}: ", **settings)
+    results.put((index, best_prog, best_score))
+
+
+def _evolve_islands(islands: int, population_size: int, elite_count: int,
+                    generations: int, settings: dict[str, Any],
+                    migration_every: int, migration_k: int,
+                    rng: random.Random) -> tuple[bytes, float]:
+    """Evolve ``islands`` populations in separate processes.
+
+    The islands form a ring: each one sends its best programs to the next.
+    Returns the best program and score found on any island.
+    """
+    mailboxes = [multiprocessing.Queue() for _ in range(islands)]
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_island_worker,
+            args=(i, population_size, elite_count, generations, settings,
+                  rng.getrandbits(64), migration_every, migration_k,
+                  mailboxes[i], mailboxes[(i + 1) % islands], results))
+        for i in range(islands)
+    ]
+    for process in processes:
+        process.start()
+
+    best: list[tuple[int, bytes, float]] = []
+    try:
+        while len(best) < islands:
+            try:
+                best.append(results.get(timeout=1.0))
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in processes):
+                    raise RuntimeError("an island process exited with an error")
+    finally:
+        for process in processes:
+            if len(best) < islands:
+                process.terminate()
+            process.join()
+
+    _, best_prog, best_score = max(best, key=lambda b: b[2])
+    return best_prog, best_score
 
 
 def evolve(population_size: int, elite_count: int, generations: int, *,
            mutation_rate: float = 0.1, crossover_rate: float = 0.5,
            task: Task | None = None, instances: int = 10, steps: int = 1000,
-           init_length: int = 0,
-           rng: random.Random | None = None, verbose: int = 0) -> tuple[str, float]:
+           init_length: int = 0, resample_every: int = 5, parallel: bool = True,
+           max_workers: int | None = None, islands: int = 1,
+           migration_every: int = 10, migration_k: int = 2,
+           rng: random.Random | None = None, verbose: int = 0) -> tuple[bytes, float]:
     """Evolve a BrainFuck program.
 
+    Programs are handled as ASCII ``bytes`` throughout.
+
     Parameters
     ----------
     population_size:
@@ -92,7 +302,8 @@ def evolve(population_size: int, elite_count: int, generations: int, *,
     elite_count:
         Number of top scoring programs preserved unchanged each generation.
     generations:
-        How many generations to evolve.
+        How many generations to evolve. With ``0`` the initial population is
+        scored once and its best program is returned.
     mutation_rate:
         Probability of applying a mutation at each position.
     crossover_rate:
@@ -106,6 +317,27 @@ def evolve(population_size: int, elite_count: int, generations: int, *,
     init_length:
         If greater than ``0``, population individuals start as random programs
         of this length instead of empty strings.
+    resample_every:
+        Number of generations that share one set of task instances. Scores
+        are cached while the instances stay the same, so surviving programs
+        are only evaluated again after a resample. Must be at least ``1``.
+    parallel:
+        Evaluate programs in a pool of worker processes.
+    max_workers:
+        Number of worker processes used when ``parallel`` is set. Defaults to
+        the number of CPUs.
+    islands:
+        Number of independent populations, each evolved in its own process
+        with ``population_size // islands`` individuals. ``elite_count``
+        applies to each island and must be smaller than its size. Islands
+        evaluate their programs serially, so ``parallel`` and ``max_workers``
+        only apply when ``islands`` is ``1``.
+    migration_every:
+        Number of generations between migrations when ``islands`` is greater
+        than ``1``. Must be at least ``1``.
+    migration_k:
+        Number of top programs each island sends to the next one per
+        migration.
     rng:
         Optional random generator.
     verbose:
@@ -114,62 +346,36 @@ def evolve(population_size: int, elite_count: int, generations: int, *,
 
     Returns
     -------
-    tuple[str, float]
-        The best program found and its score on the final generation.
+    tuple[bytes, float]
+        The best program found in any generation, on any island, and the
+        score it had on that generation's inputs.
     """
 
+    if resample_every < 1:
+        raise ValueError(f"resample_every must be at least 1, got {resample_every}")
+
     rng = rng or random.Random()
     task = task or AdditionTask()
-    if init_length > 0:
-        population = [_random_program(rng, init_length) for _ in range(population_size)]
-    else:
-        population = ["" for _ in range(population_size)]
-
-    best_prog = ""
-    best_score = float("-inf")
+    settings = dict(mutation_rate=mutation_rate, crossover_rate=crossover_rate,
+                    task=task, instances=instances, steps=steps,
+                    init_length=init_length, resample_every=resample_every,
+                    verbose=verbose)
 
-    for gen in range(generations):
-        eval_inputs = [task.generate_input(rng) for _ in range(instances)]
-        scores = [evaluate(prog, task=task, steps=steps, rng=rng,
-                          inputs=eval_inputs)
-                  for prog in population]
-        pairs = list(zip(population, scores))
-        pairs.sort(key=lambda p: p[1], reverse=True)
-        population = [p[0] for p in pairs]
-        scores = [p[1] for p in pairs]
-
-        if scores[0] > best_score:
-            best_prog = population[0]
-            best_score = scores[0]
-
-        if verbose:
-            avg = sum(scores) / len(scores)
-            msg = f"Gen {gen + 1}/{generations}: best={scores[0]} avg={avg:.2f}"
-            print(msg)
-            if verbose > 1:
-                print(f"  Best program: {population[0]!r}")
-
-        elites = population[:elite_count]
-        fitnesses = scores
-
-        new_population = elites.copy()
-        while len(new_population) < population_size:
-            if rng.random() < crossover_rate:
-                parent1 = _select(population, fitnesses, rng)
-                parent2 = _select(population, fitnesses, rng)
-                child = _crossover(parent1, parent2, rng)
-            else:
-                parent = _select(population, fitnesses, rng)
-                child = parent
-            child = _mutate(child, rng, mutation_rate)
-            new_population.append(child)
-
-        population = new_population
+    if islands > 1:
+        island_size = max(1, population_size // islands)
+        if migration_every < 1:
+            raise ValueError(f"migration_every must be at least 1, got {migration_every}")
+        if elite_count >= island_size:
+            raise ValueError(f"elite_count must be less than the island size {island_size}, "
+                             f"got {elite_count}")
+        return _evolve_islands(islands, island_size, elite_count, generations,
+                               settings, migration_every, migration_k, rng)
 
-    # Final evaluation to return accurate best score
-    final_inputs = [task.generate_input(rng) for _ in range(instances)]
-    final_scores = [evaluate(prog, task=task, steps=steps, rng=rng,
-                            inputs=final_inputs)
-                    for prog in population]
-    best_idx = max(range(len(population)), key=lambda i: final_scores[i])
-    return population[best_idx], final_scores[best_idx]
+    workers = max_workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers) if parallel and workers > 1 else None
+    try:
+        return _evolve_population(population_size, elite_count, generations,
+                                  rng=rng, pool=pool, workers=workers, **settings)
+    finally:
+        if pool is not None:
+            pool.shutdown()
@@ -2,47 +2,303 @@
 
 This module provides a function to execute BrainFuck code on a cyclic tape of
 signed bytes.
+
+Programs are first compiled into a sequence of ``(opcode, arg, arg2)`` tuples.
+Runs of ``+``/``-`` and ``>``/``<`` are collapsed into a single ``ADD`` or
+``MOVE`` carrying the net amount, and brackets become ``JZ``/``JNZ`` jumps
+whose targets are indices into the compiled sequence. Common loop idioms such
+as ``[-]``, ``[>]`` and ``[->+<]`` are replaced by a few dedicated ops.
+
+The interpreter loop is also available as an optional C extension built from
+``_executor.pyx``. When it has been compiled, :func:`execute` and
+:func:`execute_batch` use it automatically.
 """
 
-from typing import Iterable, List, Mapping
+from array import array
+from functools import lru_cache
+from typing import Callable, Hashable, Iterable, List, Sequence, Tuple
+
+try:
+    from _executor import execute_batch as _execute_batch
+    from _executor import execute_compiled as _execute_compiled
+except ImportError:  # the C extension has not been built
+    _execute_batch = None
+    _execute_compiled = None
+
+# Opcodes of the compiled representation.
+ADD = 0
+MOVE = 1
+JZ = 2
+JNZ = 3
+CLEAR = 4
+MULADD = 5
+SCAN = 6
+SPIN = 7
+
+_RUNS = {
+    ord("+"): (ADD, 1),
+    ord("-"): (ADD, -1),
+    ord(">"): (MOVE, 1),
+    ord("<"): (MOVE, -1),
+}
+_OPEN = ord("[")
+_CLOSE = ord("]")
 
 
-def _wrap_byte(value: int) -> int:
-    """Wrap integer to signed byte range [-128, 127]."""
-    return ((value + 128) % 256) - 128
+def _loop_effect(body: Sequence[Tuple[int, int, int]],
+                 size: int) -> Tuple[dict[int, int], int] | None:
+    """Return the effect of one iteration of the loop ``[body]``.
+
+    The result maps cell offsets, reduced modulo ``size`` so that cells which
+    alias on the cyclic tape are combined, to the amount added to them, along
+    with the net movement of the data pointer. ``None`` is returned when the
+    body contains anything other than ``ADD`` and ``MOVE``.
+    """
+    offset = 0
+    deltas: dict[int, int] = {}
+    for opcode, arg, _ in body:
+        if opcode == ADD:
+            deltas[offset] = deltas.get(offset, 0) + arg
+        elif opcode == MOVE:
+            offset = (offset + arg) % size
+        else:
+            return None
+    return deltas, offset
 
 
-def _build_bracket_map(program: str) -> Mapping[int, int]:
-    """Pre-compute matching bracket positions.
+def _simplify_loop(body: Sequence[Tuple[int, int, int]],
+                   size: int) -> List[Tuple[int, int, int]] | None:
+    """Return loop free ops equivalent to the loop ``[body]``, or ``None``.
 
-    Unmatched brackets are ignored and simply not present in the resulting map.
+    Loops that only move the data pointer such as ``[>]`` become a ``SCAN``
+    for a zero cell. Loops that return to their starting cell after changing
+    it by exactly one, such as ``[-]`` or ``[->+<]``, become one ``MULADD``
+    per other cell they touch followed by a ``CLEAR`` of the starting cell.
     """
+    if len(body) == 1 and body[0][0] == MOVE:
+        return [(SCAN, body[0][1], 0)]
+    effect = _loop_effect(body, size)
+    if effect is None:
+        return None
+    deltas, offset = effect
+    step = deltas.pop(0, 0)
+    if offset != 0 or step not in (1, -1):
+        return None
+    # The loop runs ``-step * cell`` times modulo 256, so every iteration's
+    # ``delta`` adds up to ``-step * delta * cell``.
+    ops = [(MULADD, off, -step * delta) for off, delta in deltas.items() if delta]
+    ops.append((CLEAR, 0, 0))
+    return ops
+
+
+def _never_exits(body: Sequence[Tuple[int, int, int]], size: int) -> bool:
+    """Return whether the loop ``[body]`` runs forever once it is entered.
+
+    This is the case when an iteration returns to the starting cell without
+    changing its value, so the cell stays nonzero.
+    """
+    effect = _loop_effect(body, size)
+    if effect is None:
+        return False
+    deltas, offset = effect
+    return offset == 0 and deltas.get(0, 0) % 256 == 0
+
+
+def _unmatched_brackets(program: bytes) -> set[int]:
+    """Return the positions of brackets in ``program`` that have no match."""
     stack: List[int] = []
-    pairs: dict[int, int] = {}
+    unmatched: set[int] = set()
     for pos, char in enumerate(program):
-        if char == "[":
+        if char == _OPEN:
             stack.append(pos)
-        elif char == "]":
+        elif char == _CLOSE:
             if stack:
-                open_pos = stack.pop()
-                pairs[open_pos] = pos
-                pairs[pos] = open_pos
-    # Unmatched '[' are ignored by leaving them out of the map
-    return pairs
+                stack.pop()
+            else:
+                unmatched.add(pos)
+    unmatched.update(stack)
+    return unmatched
+
+
+@lru_cache(maxsize=8192)
+def _compile(program: str | bytes, size: int) -> Tuple[Tuple[int, int, int], ...]:
+    """Compile ``program`` for a tape of ``size`` cells.
+
+    ``program`` may be a ``str`` or ASCII ``bytes``; strings are encoded first
+    so both are scanned as byte values.
+
+    ``size`` must be a power of two so the data pointer can wrap with a bit
+    mask. The result is a tuple of ``(opcode, arg, arg2)`` tuples. ``ADD`` and
+    ``MOVE`` carry the net change of a run of instructions, with moves reduced
+    modulo ``size``; runs that cancel out are dropped entirely. ``JZ`` and
+    ``JNZ`` carry the index of the matching jump. Loops recognized by
+    :func:`_simplify_loop` are replaced by ``CLEAR``, ``MULADD`` and ``SCAN``
+    ops, and loops that can never exit start with ``SPIN`` instead of ``JZ``.
+    Unmatched brackets and characters other than ``><+-[]`` are dropped, so
+    the compiled program contains only ops that do something.
+    """
+    if size <= 0 or size & (size - 1):
+        raise ValueError(f"tape size must be a power of two, got {size}")
+    mask = size - 1
+    if isinstance(program, str):
+        program = program.encode()
+    ops: List[Tuple[int, int, int]] = []
+    stack: List[int] = []
+    unmatched = _unmatched_brackets(program)
+    for pos, char in enumerate(program):
+        if pos in unmatched:
+            continue
+        run = _RUNS.get(char)
+        if run is not None:
+            opcode, amount = run
+            if ops and ops[-1][0] == opcode:
+                amount += ops.pop()[1]
+            if opcode == MOVE:
+                amount &= mask
+            if amount:
+                ops.append((opcode, amount, 0))
+        elif char == _OPEN:
+            stack.append(len(ops))
+            ops.append((JZ, len(ops), 0))
+        elif char == _CLOSE:
+            open_pos = stack.pop()
+            simplified = _simplify_loop(ops[open_pos + 1:], size)
+            if simplified is not None:
+                ops[open_pos:] = simplified
+            else:
+                body = ops[open_pos + 1:]
+                opcode = SPIN if _never_exits(body, size) else JZ
+                ops[open_pos] = (opcode, len(ops), 0)
+                ops.append((JNZ, open_pos, 0))
+    return tuple(ops)
+
+
+@lru_cache(maxsize=8192)
+def _compile_flat(program: str | bytes, size: int) -> array:
+    """Return the compiled ``program`` flattened into an ``int`` array."""
+    return array("i", [value for op in _compile(program, size) for value in op])
+
+
+@lru_cache(maxsize=8192)
+def _compile_columns(program: str | bytes, size: int) -> Tuple[Tuple[int, ...], ...]:
+    """Return the compiled ``program`` as parallel opcode and argument columns.
 
+    The Python loop indexes ``codes[i]`` and ``args[i]`` directly instead of
+    unpacking an op tuple, and only reads the column an opcode needs. For
+    ``JZ``, ``JNZ`` and ``SPIN`` the ``args`` column is the jump table.
+    """
+    return tuple(zip(*_compile(program, size))) or ((), (), ())
+
+
+def program_key(program: str | bytes, size: int) -> Hashable:
+    """Return a key that is equal for programs with the same compiled form.
+
+    Programs with equal keys produce the same final tape for every input on a
+    tape of ``size`` cells, so their evaluation results can be shared.
+    """
+    return _compile(program, size)
 
-def execute(program: str, *, steps: int, size: int, initial: Iterable[int] | None = None) -> List[int]:
+
+# Source of the pure Python interpreter loop. :func:`_make_run` fills in the
+# tape size, its mask and the opcodes as literals for each tape size in use.
+_RUN_SOURCE = """
+def run(ops, tape, steps):
+    codes, args, factors = ops
+    data_ptr = 0
+    instr_ptr = 0
+    executed = 0
+    prog_len = len(codes)
+
+    while instr_ptr < prog_len and executed < steps:
+        opcode = codes[instr_ptr]
+        if opcode == {ADD}:
+            tape[data_ptr] += args[instr_ptr]
+        elif opcode == {MOVE}:
+            data_ptr = (data_ptr + args[instr_ptr]) & {mask}
+        elif opcode == {JZ}:
+            if not tape[data_ptr] & 0xFF:
+                instr_ptr = args[instr_ptr]
+        elif opcode == {JNZ}:
+            if tape[data_ptr] & 0xFF:
+                instr_ptr = args[instr_ptr]
+        elif opcode == {CLEAR}:
+            tape[data_ptr] = 0
+        elif opcode == {MULADD}:
+            factor = factors[instr_ptr]
+            tape[(data_ptr + args[instr_ptr]) & {mask}] += factor * (tape[data_ptr] & 0xFF)
+        elif opcode == {SCAN}:
+            arg = args[instr_ptr]
+            moves = 0
+            while tape[data_ptr] & 0xFF and moves < {size}:
+                data_ptr = (data_ptr + arg) & {mask}
+                moves += 1
+            if tape[data_ptr] & 0xFF:
+                break  # no reachable cell is zero, so the loop never ends
+        else:  # SPIN
+            arg = args[instr_ptr]
+            if not tape[data_ptr] & 0xFF:
+                instr_ptr = arg
+            else:
+                # The loop only ends with the step budget. Apply every full
+                # iteration that fits in it at once, then run the rest of the
+                # budget through the body as usual.
+                iteration = arg - instr_ptr
+                repeats = (steps - executed - 1) // iteration
+                ptr = data_ptr
+                for i in range(instr_ptr + 1, arg):
+                    amount = args[i]
+                    if codes[i] == {ADD}:
+                        tape[ptr] += amount * repeats
+                    else:
+                        ptr = (ptr + amount) & {mask}
+                executed += repeats * iteration
+        instr_ptr += 1
+        executed += 1
+"""
+
+
+@lru_cache(maxsize=None)
+def _make_run(size: int) -> Callable[[Tuple[Tuple[int, ...], ...], List[int], int], None]:
+    """Return the interpreter loop specialized for a tape of ``size`` cells.
+
+    The returned function runs ops from :func:`_compile_columns` on a tape in
+    place. Its source is generated from ``_RUN_SOURCE`` with ``size``, the
+    wrap mask and the opcodes baked in as constants, so the hot loop does no
+    global lookups.
+    """
+    source = _RUN_SOURCE.format(size=size, mask=size - 1, ADD=ADD, MOVE=MOVE,
+                                JZ=JZ, JNZ=JNZ, CLEAR=CLEAR, MULADD=MULADD,
+                                SCAN=SCAN)
+    namespace: dict = {}
+    exec(compile(source, f"<executor run size={size}>", "exec"), namespace)
+    return namespace["run"]
+
+
+def _initial_tape(initial: Iterable[int] | None, size: int) -> List[int]:
+    """Return ``initial`` truncated or zero padded to ``size`` cells."""
+    tape = list(initial or [])
+    if len(tape) < size:
+        tape.extend([0] * (size - len(tape)))
+    else:
+        tape = tape[:size]
+    return tape
+
+
+def execute(program: str | bytes, *, steps: int, size: int, initial: Iterable[int] | None = None) -> List[int]:
     """Execute ``program`` for up to ``steps`` instructions.
 
     Parameters
     ----------
     program:
-        BrainFuck program consisting of the characters ``><+-[]``. Any other
-        characters are ignored.
+        BrainFuck program consisting of the characters ``><+-[]``, as a
+        ``str`` or ASCII ``bytes``. Any other characters are ignored.
     steps:
-        Maximum number of instructions to execute.
+        Maximum number of compiled instructions to execute. A run of
+        ``+``/``-`` or ``>``/``<`` counts as a single instruction, and so does
+        each op replacing a recognized loop idiom. Ignored characters and
+        unmatched brackets do not count.
     size:
-        Number of cells on the cyclic tape.
+        Number of cells on the cyclic tape. Must be a power of two.
     initial:
         Optional iterable of initial cell values. If fewer than ``size`` values
         are provided, remaining cells start at ``0``.
@@ -53,46 +309,66 @@ def execute(program: str, *, steps: int, size: int, initial: Iterable[int] | Non
         The final tape state after execution.
     """
 
-    # Initialize the tape
-    tape = list(initial or [])
-    if len(tape) < size:
-        tape.extend([0] * (size - len(tape)))
-    else:
-        tape = tape[:size]
+    # Initialize the tape. Cells are plain ints that are only reduced modulo
+    # 256 when tested against zero and once more when execution finishes, so
+    # ``+`` and ``-`` need no wrapping on every step.
+    tape = _initial_tape(initial, size)
 
-    tape = [_wrap_byte(v) for v in tape]
+    if _execute_compiled is not None:
+        cells = array("b", [((v + 128) & 0xFF) - 128 for v in tape])
+        _execute_compiled(_compile_flat(program, size), cells, steps, size)
+        return cells.tolist()
 
-    bracket_map = _build_bracket_map(program)
+    _make_run(size)(_compile_columns(program, size), tape, steps)
+    return [((v + 128) & 0xFF) - 128 for v in tape]
 
-    data_ptr = 0
-    instr_ptr = 0
 
-    executed = 0
-    prog_len = len(program)
+def pack_tapes(tapes: Iterable[Iterable[int] | None], size: int) -> array:
+    """Pack ``tapes`` into one signed byte array of ``size`` cells per tape.
 
-    while instr_ptr < prog_len and executed < steps:
-        command = program[instr_ptr]
-        if command == '>':
-            data_ptr = (data_ptr + 1) % size
-        elif command == '<':
-            data_ptr = (data_ptr - 1) % size
-        elif command == '+':
-            tape[data_ptr] = _wrap_byte(tape[data_ptr] + 1)
-        elif command == '-':
-            tape[data_ptr] = _wrap_byte(tape[data_ptr] - 1)
-        elif command == '[':
-            if tape[data_ptr] == 0:
-                match = bracket_map.get(instr_ptr)
-                if match is not None:
-                    instr_ptr = match
-        elif command == ']':
-            if tape[data_ptr] != 0:
-                match = bracket_map.get(instr_ptr)
-                if match is not None:
-                    instr_ptr = match
-        # Ignore unknown characters and unmatched brackets
-        instr_ptr += 1
-        executed += 1
+    Each tape is truncated or zero padded to ``size`` cells and its values are
+    wrapped to the signed byte range.
+    """
+    cells = array("b")
+    for tape in tapes:
+        cells.extend([((v + 128) & 0xFF) - 128 for v in _initial_tape(tape, size)])
+    return cells
 
-    return tape
 
+def execute_batch(program: str | bytes, *, steps: int, size: int,
+                  initials: Iterable[Iterable[int] | None] | array) -> List[List[int]]:
+    """Execute ``program`` once for every tape in ``initials``.
+
+    This is equivalent to calling :func:`execute` for each initial tape, but
+    the program is compiled once and the tapes are kept in one signed byte
+    array, which the C extension runs in a single call. ``initials`` may also
+    be a signed byte array produced by :func:`pack_tapes`, which is used
+    without converting it again.
+
+    Returns
+    -------
+    list[list[int]]
+        The final tape of each run, in the order of ``initials``.
+    """
+
+    if isinstance(initials, array) and initials.typecode == "b":
+        cells = array("b", initials)
+    else:
+        cells = pack_tapes(initials, size)
+
+    if not cells:
+        return []
+
+    if _execute_batch is not None:
+        _execute_batch(_compile_flat(program, size), cells, steps, size)
+    else:
+        # Mirror the extension: run every tape in place in the packed array.
+        # Each tape is unpacked to a list while it runs because the loop
+        # relies on cells growing past the signed byte range between wraps.
+        run = _make_run(size)
+        ops = _compile_columns(program, size)
+        for start in range(0, len(cells), size):
+            tape = cells[start:start + size].tolist()
+            run(ops, tape, steps)
+            cells[start:start + size] = array("b", [((v + 128) & 0xFF) - 128 for v in tape])
+    return [cells[i:i + size].tolist() for i in range(0, len(cells), size)]
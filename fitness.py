@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass
 from typing import List, Protocol, Sequence
 import random
 
-from executor import execute
+from executor import execute_batch, pack_tapes
 
 
 class Task(Protocol):
@@ -17,7 +18,7 @@ class Task(Protocol):
     def generate_input(self, rng: random.Random) -> List[int]:
         """Return a list of initial cell values for one instance."""
 
-    def fitness(self, initial: List[int], final: List[int]) -> float:
+    def fitness(self, initial: Sequence[int], final: List[int]) -> float:
         """Return a fitness value for ``final`` given ``initial``."""
 
 
@@ -39,7 +40,7 @@ class AdditionTask:
         tape = [a, b] + [0] * (self.size - 2)
         return tape
 
-    def fitness(self, initial: List[int], final: List[int]) -> float:
+    def fitness(self, initial: Sequence[int], final: List[int]) -> float:
         expected = initial[0] + initial[1]
         error = abs(final[0] - expected)
         return -float(error)
@@ -66,21 +67,34 @@ class TripleAdditionTask:
         tape = [a, b, c] + [0] * (self.size - 3)
         return tape
 
-    def fitness(self, initial: List[int], final: List[int]) -> float:
+    def fitness(self, initial: Sequence[int], final: List[int]) -> float:
         expected = initial[0] + initial[1] + initial[2]
         error = abs(final[0] - expected)
         return -float(error)
 
 
-def evaluate(program: str, *, task: Task | None = None, instances: int = 1,
+def generate_inputs(task: Task, rng: random.Random,
+                    instances: int) -> tuple[List[List[int]], array]:
+    """Return ``instances`` inputs of ``task`` and the same tapes packed.
+
+    The packed tapes are laid out one after another as produced by
+    :func:`executor.pack_tapes`, so they can be passed to :func:`evaluate`
+    along with the inputs for many programs without being converted again.
+    """
+    inputs = [task.generate_input(rng) for _ in range(instances)]
+    return inputs, pack_tapes(inputs, task.size)
+
+
+def evaluate(program: str | bytes, *, task: Task | None = None, instances: int = 1,
              steps: int = 1000, rng: random.Random | None = None,
-             inputs: Sequence[List[int]] | None = None) -> float:
+             inputs: Sequence[List[int]] | None = None,
+             packed: array | None = None) -> float:
     """Evaluate ``program`` on ``instances`` of ``task``.
 
     Parameters
     ----------
     program:
-        BrainFuck program to execute.
+        BrainFuck program to execute, as a ``str`` or ASCII ``bytes``.
     task:
         Task providing inputs and computing fitness. Defaults to :class:`AdditionTask`.
     instances:
@@ -93,6 +107,11 @@ def evaluate(program: str, *, task: Task | None = None, instances: int = 1,
     inputs:
         Optional sequence of pre-generated initial tapes. When provided all
         programs are evaluated on these inputs instead of generating new ones.
+    packed:
+        Optional ``inputs`` packed by :func:`generate_inputs`, used to run the
+        program without packing ``inputs`` again. The fitness is still
+        computed from ``inputs``, which may hold values outside the signed
+        byte range.
 
     Returns
     -------
@@ -103,15 +122,9 @@ def evaluate(program: str, *, task: Task | None = None, instances: int = 1,
     if task is None:
         task = AdditionTask()
 
-    rng = rng or random.Random()
-
     if inputs is None:
-        inputs = [task.generate_input(rng) for _ in range(instances)]
-
-    score = 0.0
-    for initial in inputs:
-        final = execute(program, steps=steps, size=task.size, initial=initial)
-        score += task.fitness(list(initial), final)
-
-    return score
+        inputs, packed = generate_inputs(task, rng or random.Random(), instances)
 
+    finals = execute_batch(program, steps=steps, size=task.size,
+                           initials=inputs if packed is None else packed)
+    return sum(map(task.fitness, inputs, finals), 0.0)
@@ -24,7 +24,7 @@ def main() -> None:
     parser.add_argument("--task", choices=["addition", "triple"], default="addition",
                         help="evaluation task to use")
     parser.add_argument("--size", type=int, default=8,
-                        help="tape size for the addition task")
+                        help="tape size for the task; must be a power of two")
     parser.add_argument("--min-value", type=int, default=-64,
                         help="minimum random input value for the addition task")
     parser.add_argument("--max-value", type=int, default=63,
@@ -33,6 +33,18 @@ def main() -> None:
                         help="random seed")
     parser.add_argument("--steps", type=int, default=1000,
                         help="maximum instructions executed per evaluation")
+    parser.add_argument("--resample-every", type=int, default=5,
+                        help="generations between drawing new evaluation instances")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes used for evaluation")
+    parser.add_argument("--no-parallel", dest="parallel", action="store_false",
+                        help="evaluate programs in the main process only")
+    parser.add_argument("--islands", type=int, default=1,
+                        help="number of populations evolved in separate processes")
+    parser.add_argument("--migration-every", type=int, default=10,
+                        help="generations between migrations between islands")
+    parser.add_argument("--migration-k", type=int, default=2,
+                        help="number of programs each island sends per migration")
     parser.add_argument("-v", "--verbose", action="count", default=0,
                         help="increase verbosity; can be specified multiple times")
 
@@ -59,11 +71,17 @@ def main() -> None:
         instances=args.instances,
         steps=args.steps,
         init_length=args.init_length,
+        resample_every=args.resample_every,
+        parallel=args.parallel,
+        max_workers=args.workers,
+        islands=args.islands,
+        migration_every=args.migration_every,
+        migration_k=args.migration_k,
         rng=rng,
         verbose=args.verbose,
     )
 
-    print(program)
+    print(program.decode())
     print(f"Score: {score:.2f}")
 
 
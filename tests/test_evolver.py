@@ -0,0 +1,94 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from evolver import _build_selector, _mutate, _select
+
+def test_select_never_picks_lowest_fitness():
+    population = [b"a", b"b", b"c"]
+    cumulative = _build_selector([-5.0, -1.0, -3.0])
+    rng = random.Random(0)
+    picks = [_select(population, cumulative, rng) for _ in range(1000)]
+    assert b"a" not in picks
+    assert picks.count(b"b") > picks.count(b"c") > 0
+    assert _select(population, _build_selector([2.0, 2.0, 2.0]), rng) in population
+    assert _select(population, _build_selector([-1.0, -1.0, -1.0]), rng) in population
+
+def test_mutate_rate_matches_per_position_draws():
+    rng = random.Random(0)
+    program = b"+" * 50
+    assert _mutate(program, rng, 0.0) == program
+    samples = [len(_mutate(program, rng, 0.1)) for _ in range(5000)]
+    # 51 positions mutate with probability 0.1: substitutions keep the
+    # length, deletions remove one and insertions add 1.1 on average, while
+    # the extra position past the end can only insert.
+    expected = 50 + 50 * 0.1 * (0 - 1 + 1.1) / 3 + 0.1 * 1.1
+    assert abs(sum(samples) / len(samples) - expected) < 0.15
+    assert all(c in b"><+-[]" for c in _mutate(program, rng, 1.0))
+
+def test_population_shares_scores_of_equivalent_programs(monkeypatch):
+    import evolver
+    from array import array
+    from fitness import AdditionTask
+    evaluated = []
+    def fake_worker(args):
+        evaluated.append(args[0])
+        return float(len(args[0]))
+    monkeypatch.setattr(evolver, "_eval_worker", fake_worker)
+    population = [b"+-", b"", b"><", b"[-]", b"[+]", b"[-]"]
+    cache = {}
+    scores = evolver._evaluate_population(population, AdditionTask(), 100, [], array("b"), cache, None, 1)
+    assert len(evaluated) == 2
+    assert scores[0] == scores[1] == scores[2]
+    assert scores[3] == scores[4] == scores[5]
+    assert evolver._evaluate_population(population, AdditionTask(), 100, [], array("b"), cache, None, 1) == scores
+    assert len(evaluated) == 2
+
+def test_migrants_join_next_generation():
+    import evolver
+    from fitness import AdditionTask
+    sent = []
+    def migrate(population):
+        sent.append(list(population))
+        return [b">[-<+>]"]
+    prog, score = evolver._evolve_population(
+        10, 2, 4, mutation_rate=0.0, crossover_rate=0.0, task=AdditionTask(),
+        instances=5, steps=100, init_length=3, resample_every=1,
+        rng=random.Random(0), verbose=0, pool=None, workers=1,
+        migrate=migrate, migration_every=2)
+    assert len(sent) == 1 and len(sent[0]) == 10
+    assert (prog, score) == (b">[-<+>]", 0.0)
+
+def test_islands_return_global_best():
+    from evolver import evolve
+    prog, score = evolve(8, 1, 4, init_length=5, islands=2, migration_every=2,
+                         rng=random.Random(0))
+    assert isinstance(prog, bytes) and score <= 0
+
+def test_evolve_rejects_invalid_resample_every():
+    from evolver import evolve
+    with pytest.raises(ValueError):
+        evolve(4, 1, 2, resample_every=0, parallel=False)
+
+def test_evolve_rejects_invalid_island_settings():
+    from evolver import evolve
+    with pytest.raises(ValueError):
+        evolve(8, 1, 2, islands=2, migration_every=0)
+    with pytest.raises(ValueError):
+        evolve(8, 4, 2, islands=2)
+
+def test_parallel_evaluation_matches_serial():
+    from evolver import evolve
+    results = [evolve(12, 2, 3, init_length=6, parallel=parallel, max_workers=2,
+                      rng=random.Random(4))
+               for parallel in (False, True)]
+    assert results[0] == results[1]
+
+def test_zero_generations_scores_initial_population():
+    from evolver import evolve
+    prog, score = evolve(6, 1, 0, init_length=4, parallel=False, rng=random.Random(0))
+    assert len(prog) >= 4 and score > float("-inf")
@@ -0,0 +1,153 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from executor import execute
+
+def test_cells_wrap_to_signed_bytes():
+    assert execute("-", steps=10, size=2) == [-1, 0]
+    assert execute("+", steps=10, size=2, initial=[127]) == [-128, 0]
+    assert execute("", steps=10, size=2, initial=[300, -200]) == [44, 56]
+
+def test_tape_is_cyclic():
+    assert execute("<+", steps=10, size=4) == [0, 0, 0, 1]
+    assert execute(">>>>+", steps=10, size=4) == [1, 0, 0, 0]
+
+def test_loop_runs_until_wrapped_zero():
+    # 255 decrements of the counter bring -1 back to zero through wraparound.
+    final = execute("[->+<]", steps=10000, size=2, initial=[-1])
+    assert final == [0, -1]
+
+def test_unmatched_brackets_are_ignored():
+    assert execute("]+[+", steps=10, size=1) == [2]
+
+def test_compile_collapses_runs():
+    from executor import ADD, MOVE, JZ, JNZ, _compile
+    assert _compile("+++>><-[-->]", 8) == ((ADD, 3, 0), (MOVE, 1, 0), (ADD, -1, 0),
+                                          (JZ, 6, 0), (ADD, -2, 0), (MOVE, 1, 0),
+                                          (JNZ, 3, 0))
+    assert _compile("+-><", 8) == ()
+    assert _compile("+]+[>", 8) == ((ADD, 2, 0), (MOVE, 1, 0))
+    assert _compile(b"+[->+<]x", 8) == _compile("+[->+<]x", 8)
+
+def test_compile_replaces_loop_idioms():
+    from executor import CLEAR, MOVE, MULADD, SCAN, _compile
+    assert _compile("[-]", 8) == ((CLEAR, 0, 0),)
+    assert _compile("[<]", 8) == ((SCAN, 7, 0),)
+    assert _compile("[<<<]<", 4) == ((SCAN, 1, 0), (MOVE, 3, 0))
+    assert _compile("[->+>---<<]", 8) == ((MULADD, 1, 1), (MULADD, 2, -3), (CLEAR, 0, 0))
+    assert _compile("[+<<+>>]", 8) == ((MULADD, 6, -1), (CLEAR, 0, 0))
+    # On a two cell tape ``>>`` returns to the counter, so the loop never ends.
+    assert _compile("[->>+<<]", 2)[0][0] != CLEAR
+
+def test_scan_without_zero_cell_stops():
+    assert execute("[>]+", steps=1000, size=4, initial=[1, 2, 3, 4]) == [1, 2, 3, 4]
+    assert execute("[>]+", steps=1000, size=4, initial=[1, 2, 0, 4]) == [1, 2, 1, 4]
+
+def _reference_execute(program, steps, size, initial):
+    """Straightforward character-at-a-time interpreter used as an oracle."""
+    tape = list(initial) + [0] * (size - len(initial))
+    stack, pairs = [], {}
+    for pos, char in enumerate(program):
+        if char == "[":
+            stack.append(pos)
+        elif char == "]" and stack:
+            open_pos = stack.pop()
+            pairs[open_pos], pairs[pos] = pos, open_pos
+    data_ptr = instr_ptr = executed = 0
+    while instr_ptr < len(program) and executed < steps:
+        char = program[instr_ptr]
+        if char == ">":
+            data_ptr = (data_ptr + 1) % size
+        elif char == "<":
+            data_ptr = (data_ptr - 1) % size
+        elif char in "+-":
+            value = tape[data_ptr] + (1 if char == "+" else -1)
+            tape[data_ptr] = ((value + 128) % 256) - 128
+        elif char == "[" and tape[data_ptr] == 0:
+            instr_ptr = pairs.get(instr_ptr, instr_ptr)
+        elif char == "]" and tape[data_ptr] != 0:
+            instr_ptr = pairs.get(instr_ptr, instr_ptr)
+        instr_ptr += 1
+        executed += 1
+    halted = instr_ptr >= len(program)
+    return tape, halted
+
+# Single instructions mixed with the loop idioms the compiler rewrites.
+_TOKENS = list("><+-[]") + ["[-]", "[+]", "[>]", "[<<]", "[->+<]", "[+>--<<+>]"]
+
+def test_matches_reference_on_halting_programs():
+    rng = random.Random(1)
+    checked = 0
+    for _ in range(2000):
+        program = "".join(rng.choice(_TOKENS) for _ in range(rng.randint(0, 30)))
+        initial = [rng.randint(-128, 127) for _ in range(8)]
+        expected, halted = _reference_execute(program, 5000, 8, initial)
+        if halted:
+            checked += 1
+            assert execute(program, steps=10 ** 6, size=8, initial=initial) == expected, program
+    assert checked > 500
+
+def test_c_extension_matches_python_loop(monkeypatch):
+    pytest.importorskip("_executor")
+    import executor
+    rng = random.Random(2)
+    cases = []
+    for _ in range(500):
+        program = "".join(rng.choice("><+-[]") for _ in range(rng.randint(0, 30)))
+        initial = [rng.randint(-128, 127) for _ in range(8)]
+        cases.append((program, initial, execute(program, steps=300, size=8, initial=initial)))
+    monkeypatch.setattr(executor, "_execute_compiled", None)
+    for program, initial, expected in cases:
+        assert execute(program, steps=300, size=8, initial=initial) == expected, program
+
+def test_execute_batch_matches_execute():
+    from executor import execute_batch
+    initials = [[1, 2], [-5], [], [127, 127, 127, 127, 127]]
+    program = "[->+<]>[-<++>]+"
+    finals = execute_batch(program, steps=1000, size=4, initials=initials)
+    assert finals == [execute(program, steps=1000, size=4, initial=i) for i in initials]
+    assert execute_batch(program, steps=1000, size=4, initials=[]) == []
+
+def test_endless_loop_matches_step_by_step_execution():
+    from executor import SPIN, _compile
+    program = "[>+>--<<]+"
+    assert _compile(program, 4)[0][0] == SPIN
+    # Each iteration costs the body's five ops plus the closing bracket.
+    for steps in (1, 2, 7, 23, 1000):
+        final = execute(program, steps=steps, size=4, initial=[1])
+        iterations, remainder = divmod(steps - 1, 6)
+        cell1 = iterations + (remainder >= 2)
+        cell2 = -2 * iterations - 2 * (remainder >= 4)
+        expected = [((v + 128) % 256) - 128 for v in (1, cell1, cell2, 0)]
+        assert final == expected, steps
+
+def test_endless_loops_match_plain_loops(monkeypatch):
+    import executor
+    rng = random.Random(3)
+    tokens = _TOKENS + ["[>+<]", "[<->]", "[+>++<-]", "[]"]
+    cases = []
+    for _ in range(300):
+        program = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+        initial = [rng.randint(-128, 127) for _ in range(4)]
+        steps = rng.randint(1, 400)
+        cases.append((program, initial, steps, execute(program, steps=steps, size=4, initial=initial)))
+    monkeypatch.setattr(executor, "_never_exits", lambda body, size: False)
+    executor._compile.cache_clear()
+    executor._compile_flat.cache_clear()
+    executor._compile_columns.cache_clear()
+    try:
+        for program, initial, steps, expected in cases:
+            assert execute(program, steps=steps, size=4, initial=initial) == expected, program
+    finally:
+        executor._compile.cache_clear()
+        executor._compile_flat.cache_clear()
+        executor._compile_columns.cache_clear()
+
+def test_size_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        execute("+", steps=10, size=6)
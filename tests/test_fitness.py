@@ -22,3 +22,19 @@ def test_triple_addition_fitness():
     assert task.fitness(initial, final) == 0
     final_bad = [17] + [0] * (task.size - 1)
     assert task.fitness(initial, final_bad) == -1.0
+
+def test_packed_inputs_score_like_lists():
+    from fitness import AdditionTask, evaluate, generate_inputs
+    task = AdditionTask()
+    rng = random.Random(1)
+    tapes = [task.generate_input(rng) for _ in range(5)]
+    inputs, packed = generate_inputs(task, random.Random(1), 5)
+    assert inputs == tapes and len(packed) == 5 * task.size
+    for program in ["", "[->+<]", ">[-<+>]"]:
+        assert evaluate(program, task=task, inputs=inputs, packed=packed) == evaluate(program, task=task, inputs=tapes)
+    assert evaluate(">[-<+>]", task=task, inputs=inputs, packed=packed) == 0
+    # Fitness sees the unwrapped inputs even though the tape holds signed bytes.
+    task = AdditionTask(max_value=200)
+    inputs, packed = generate_inputs(task, random.Random(1), 5)
+    assert max(max(tape) for tape in inputs) > 127
+    assert evaluate("", task=task, inputs=inputs, packed=packed) == evaluate("", task=task, inputs=inputs)